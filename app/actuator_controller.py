@@ -2,19 +2,25 @@
 Actuator Controller - SUPER SIMPLE VERSION
 No complex logic, just simple publish
 """
-import json
 import paho.mqtt.client as mqtt
 import time
 
 # Import config
-from config import MQTT_BROKER, MQTT_PORT, MQTT_TOPIC_ACTUATOR_CONTROL
+from config import MQTT_BROKER, MQTT_PORT, MQTT_TOPIC_ACTUATOR_CONTROL, ACTUATOR_KEYS
+from utils import json_dumps
+
+# Payload tetap (semua OFF / semua ON), dibuat & di-serialize sekali saat import
+ALL_OFF_PAYLOAD = {key: False for key in ACTUATOR_KEYS}
+ALL_ON_PAYLOAD = {key: True for key in ACTUATOR_KEYS}
+ALL_OFF_BYTES = json_dumps(ALL_OFF_PAYLOAD)
+ALL_ON_BYTES = json_dumps(ALL_ON_PAYLOAD)
 
 def publish_mqtt_simple(payload_dict):
     """
     Simple MQTT publish - PALING BASIC
     
     Args:
-        payload_dict (dict): Dictionary dengan 6 actuator
+        payload_dict (dict | bytes): Dictionary dengan 6 actuator, atau JSON bytes yang sudah jadi
     
     Returns:
         bool: True jika berhasil
@@ -49,10 +55,10 @@ def publish_mqtt_simple(payload_dict):
         client.loop_start()
         time.sleep(1)  # Wait 1 detik untuk koneksi stabil
         
-        # Convert to JSON
-        payload_json = json.dumps(payload_dict)
+        # Convert to JSON (bytes, langsung bisa dipublish)
+        payload_json = payload_dict if isinstance(payload_dict, bytes) else json_dumps(payload_dict)
         print(f"📦 Payload:")
-        print(f"   {payload_json}")
+        print(f"   {payload_json.decode()}")
         
         # Publish
         print(f"📡 Publishing...")
@@ -89,30 +95,18 @@ def publish_actuator_command(actuator_name, state):
     Publish single actuator command
     SIMPLE: Load from file, update one, send all
     """
-    import os
-    from config import LATEST_ACTUATOR_JSON
+    from data_logger import load_latest_actuator
     
     # Default payload
-    payload = {
-        "pump_nutrition_AB": False,
-        "pump_water": False,
-        "pump_Ph_Up": False,
-        "pump_Ph_Down": False,
-        "fan": False,
-        "led": False
-    }
+    payload = ALL_OFF_PAYLOAD.copy()
     
-    # Try load from file
-    try:
-        if os.path.exists(LATEST_ACTUATOR_JSON):
-            with open(LATEST_ACTUATOR_JSON, 'r') as f:
-                data = json.load(f)
-                # Update payload dengan data dari file (tanpa timestamp)
-                for key in payload.keys():
-                    if key in data:
-                        payload[key] = data[key]
-    except:
-        pass  # Use default if fail
+    # Try load from state DB
+    data = load_latest_actuator()
+    if data:
+        # Update payload dengan data terakhir (tanpa timestamp)
+        for key in payload.keys():
+            if key in data:
+                payload[key] = data[key]
     
     # Update yang diubah
     payload[actuator_name] = state
@@ -131,29 +125,13 @@ def publish_all_actuators(actuator_states):
 
 def turn_all_on():
     """Turn all ON"""
-    payload = {
-        "pump_nutrition_AB": True,
-        "pump_water": True,
-        "pump_Ph_Up": True,
-        "pump_Ph_Down": True,
-        "fan": True,
-        "led": True
-    }
     print("🟢 TURN ALL ON")
-    return publish_mqtt_simple(payload)
+    return publish_mqtt_simple(ALL_ON_BYTES)
 
 def turn_all_off():
     """Turn all OFF"""
-    payload = {
-        "pump_nutrition_AB": False,
-        "pump_water": False,
-        "pump_Ph_Up": False,
-        "pump_Ph_Down": False,
-        "fan": False,
-        "led": False
-    }
     print("🔴 TURN ALL OFF")
-    return publish_mqtt_simple(payload)
+    return publish_mqtt_simple(ALL_OFF_BYTES)
 
 # ============================================================
 # AUTO CONTROL - SIMPLIFIED
@@ -178,14 +156,7 @@ def apply_auto_control(prediction_result):
     print(f"   Light: {light_label}")
     
     # Initialize all OFF
-    payload = {
-        "pump_nutrition_AB": False,
-        "pump_water": False,
-        "pump_Ph_Up": False,
-        "pump_Ph_Down": False,
-        "fan": False,
-        "led": False
-    }
+    payload = ALL_OFF_PAYLOAD.copy()
     
     # pH Control Logic
     if ph_label == "Too Low":
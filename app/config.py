@@ -9,16 +9,34 @@ MQTT_TOPIC_SENSOR = "part-iot/sensor/data"
 MQTT_TOPIC_OUTPUT = "part-iot/output"
 MQTT_TOPIC_ACTUATOR = "part-iot/actuator/status"
 MQTT_TOPIC_ACTUATOR_CONTROL = "part-iot/actuator/control"
+MQTT_CLIENT_BACKEND = "paho"  # "paho" atau "gmqtt" (asyncio, butuh: pip install gmqtt)
 
 # File Paths
 MODEL_PATH = "../model/hydroponic_multioutput_rf_model.pkl"
-LOG_FILE = "prediction_log.csv"
-LATEST_JSON = "latest_prediction.json"
-LATEST_ACTUATOR_JSON = "latest_actuator.json"
-FLAG_FILE = "mqtt_running.flag"
+STATE_DB = "state.db"                      # SQLite (WAL): log readings + latest state
+LOG_FILE = "prediction_log.csv"            # Legacy, di-import sekali ke STATE_DB
+LATEST_JSON = "latest_prediction.json"     # Legacy, di-import sekali ke STATE_DB
+LATEST_ACTUATOR_JSON = "latest_actuator.json"  # Legacy, di-import sekali ke STATE_DB
 
 # Logging Configuration
 DEFAULT_LOG_INTERVAL_SECONDS = 5
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"  # Format timestamp di log & latest state
+LOG_FLUSH_MAX_ROWS = 32            # Flush buffer log ke DB setelah sekian baris
+LOG_FLUSH_INTERVAL_SECONDS = 10    # ... atau setelah sekian detik sejak flush terakhir
+LOG_BUFFER_MAXLEN = 256            # Batas buffer log jika DB gagal ditulis (baris tertua dibuang)
+
+# Dashboard Refresh Configuration
+DASHBOARD_REFRESH_SECONDS = 3         # Refresh section real-time (fragment run_every)
+DASHBOARD_CHART_REFRESH_SECONDS = 10  # Refresh chart, sejalan dengan LOG_FLUSH_INTERVAL_SECONDS
+
+# Batch Prediction Configuration
+PREDICT_BATCH_SIZE = 16               # Maksimal message sensor per batch prediksi
+PREDICT_BATCH_WINDOW_SECONDS = 0.05   # Tunggu message berikutnya maksimal selama ini
+MESSAGE_QUEUE_MAXSIZE = 1024          # Maksimal message yang antri sebelum diproses
+PREDICT_CACHE_MAXSIZE = 2048          # Maksimal hasil prediksi (per fitur terkuantisasi) yang di-cache
+
+# Latest State Configuration
+LATEST_FLUSH_INTERVAL_SECONDS = 0.5  # Latest prediction disimpan maksimal 2x per detik
 
 # Label Mappings
 PH_LABELS = {0: 'Too Low', 1: 'Low', 2: 'Normal', 3: 'High', 4: 'Too High'}
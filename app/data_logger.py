@@ -1,92 +1,346 @@
 """
 Data logging functions untuk IoT Hydroponics Dashboard
 """
+import io
 import os
-import json
+import csv
+import time
+import sqlite3
+import threading
 import pandas as pd
+from streamlit import cache_resource
+from collections import Counter, deque
 from datetime import datetime
-from config import LOG_FILE, LATEST_JSON, LATEST_ACTUATOR_JSON
+from config import (STATE_DB, LOG_FILE, LATEST_JSON, LATEST_ACTUATOR_JSON,
+                    LOG_FLUSH_MAX_ROWS, LOG_FLUSH_INTERVAL_SECONDS, LOG_BUFFER_MAXLEN,
+                    TIMESTAMP_FORMAT, PH_LABELS, TDS_LABELS, AMBIENT_LABELS, LIGHT_LABELS,
+                    STATUS_COLORS)
+from utils import json_loads, json_dumps
 
-def log_prediction(data, status):
-    """Simpan hasil prediksi ke CSV dengan semua 4 labels"""
+LOG_COLUMNS = (
+    "timestamp", "ph", "tds", "water_flow", "air_humidity", "air_temperature",
+    "ldr_value", "water_temperature", "water_level",
+    "ph_label", "tds_label", "ambient_label", "light_label", "status"
+)
+
+# Kolom label disimpan sebagai category, kolom sensor sebagai float32 saat load
+LABEL_COLUMNS = ("ph_label", "tds_label", "ambient_label", "light_label", "status")
+NUMERIC_COLUMNS = (
+    "ph", "tds", "water_flow", "air_humidity", "air_temperature",
+    "ldr_value", "water_temperature", "water_level"
+)
+# Kategori tetap per kolom label (plus label fallback prediksi), jadi kode category
+# selalu sama antar load dan value_counts cukup menghitung kode integer
+_FALLBACK_LABELS = ('Unknown', 'Error')
+LABEL_CATEGORIES = {
+    "ph_label": (*PH_LABELS.values(), *_FALLBACK_LABELS),
+    "tds_label": (*TDS_LABELS.values(), *_FALLBACK_LABELS),
+    "ambient_label": (*AMBIENT_LABELS.values(), *_FALLBACK_LABELS),
+    "light_label": (*LIGHT_LABELS.values(), *_FALLBACK_LABELS),
+    "status": tuple(STATUS_COLORS)
+}
+LOG_DTYPES = {
+    **{col: 'float32' for col in NUMERIC_COLUMNS},
+    **{col: pd.CategoricalDtype(LABEL_CATEGORIES[col]) for col in LABEL_COLUMNS}
+}
+
+# ============================================================
+# SQLITE STATE DB
+# ============================================================
+# Semua state (log readings + latest prediction/actuator) ada di satu file
+# SQLite mode WAL: reader (Streamlit) tidak pernah memblok writer (MQTT).
+
+_INSERT_READING_SQL = (
+    f"INSERT INTO readings ({', '.join(LOG_COLUMNS)}) "
+    f"VALUES ({', '.join('?' for _ in LOG_COLUMNS)})"
+)
+_INCREMENT_COUNT_SQL = (
+    "INSERT INTO label_counts (column_name, label, count) VALUES (?, ?, ?) "
+    "ON CONFLICT(column_name, label) DO UPDATE SET count = count + excluded.count"
+)
+_UPSERT_STATE_SQL = (
+    "INSERT INTO latest_state (name, payload) VALUES (?, ?) "
+    "ON CONFLICT(name) DO UPDATE SET payload = excluded.payload"
+)
+
+_db_local = threading.local()
+_db_init_lock = threading.Lock()
+_db_initialized = False
+
+def _init_db(conn):
+    """Buat tabel (sekali per proses) dan import data lama dari CSV/JSON jika DB masih kosong"""
+    global _db_initialized
+    with _db_init_lock:
+        if _db_initialized:
+            return
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS readings ("
+            "timestamp TEXT, ph REAL, tds REAL, water_flow REAL, air_humidity REAL, "
+            "air_temperature REAL, ldr_value REAL, water_temperature REAL, water_level REAL, "
+            "ph_label TEXT, tds_label TEXT, ambient_label TEXT, light_label TEXT, status TEXT)"
+        )
+        conn.execute("CREATE TABLE IF NOT EXISTS latest_state (name TEXT PRIMARY KEY, payload BLOB)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS label_counts ("
+            "column_name TEXT, label TEXT, count INTEGER, PRIMARY KEY (column_name, label))"
+        )
+        _import_legacy_files(conn)
+        _rebuild_label_counts(conn)
+        _db_initialized = True
+
+def _import_legacy_files(conn):
+    """Import prediction_log.csv & latest_*.json lama ke DB (hanya jika tabel masih kosong)"""
     try:
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-        data_row = {
-            "timestamp": timestamp,
-            "ph": float(data.get("ph", 0)),
-            "tds": float(data.get("tds", 0)),
-            "water_flow": float(data.get("water_flow", 0)),
-            "air_humidity": float(data.get("air_humidity", 0)),
-            "air_temperature": float(data.get("air_temperature", 0)),
-            "ldr_value": float(data.get("ldr_value", 0)),
-            "water_temperature": float(data.get("water_temperature", 0)),
-            "water_level": float(data.get("water_level", 0)),
-            "ph_label": data.get("ph_label", "Unknown"),
-            "tds_label": data.get("tds_label", "Unknown"),
-            "ambient_label": data.get("ambient_label", "Unknown"),
-            "light_label": data.get("light_label", "Unknown"),
-            "status": status
-        }
-
-        df_log = pd.DataFrame([data_row])
-
-        if os.path.exists(LOG_FILE):
-            df_log.to_csv(LOG_FILE, mode='a', header=False, index=False)
-        else:
-            df_log.to_csv(LOG_FILE, mode='w', header=True, index=False)
+        if conn.execute("SELECT 1 FROM readings LIMIT 1").fetchone() is None and os.path.exists(LOG_FILE):
+            with open(LOG_FILE, newline='') as f:
+                rows = [tuple(row.get(col) for col in LOG_COLUMNS) for row in csv.DictReader(f)]
+            conn.execute("BEGIN")
+            conn.executemany(_INSERT_READING_SQL, rows)
+            conn.execute("COMMIT")
+            print(f"✓ Import {len(rows)} baris log dari {LOG_FILE}")
+
+        for name, path in (('prediction', LATEST_JSON), ('actuator', LATEST_ACTUATOR_JSON)):
+            missing = conn.execute("SELECT 1 FROM latest_state WHERE name = ?", (name,)).fetchone() is None
+            if missing and os.path.exists(path):
+                with open(path, 'rb') as f:
+                    conn.execute(_UPSERT_STATE_SQL, (name, f.read()))
+    except Exception as e:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        print(f"✗ Gagal import data lama: {e}")
+
+def _rebuild_label_counts(conn):
+    """Hitung ulang label_counts dari readings (hanya jika label_counts masih kosong)"""
+    try:
+        if conn.execute("SELECT 1 FROM label_counts LIMIT 1").fetchone() is not None:
+            return
+        conn.execute("BEGIN")
+        for col in LABEL_COLUMNS:
+            conn.execute(
+                f"INSERT INTO label_counts (column_name, label, count) "
+                f"SELECT ?, {col}, COUNT(*) FROM readings WHERE {col} IS NOT NULL GROUP BY {col}",
+                (col,)
+            )
+        conn.execute("COMMIT")
+    except Exception as e:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        print(f"✗ Gagal hitung label counts: {e}")
+
+def _connect(check_same_thread=True):
+    """Buka koneksi SQLite (autocommit, WAL, synchronous=NORMAL)"""
+    conn = sqlite3.connect(STATE_DB, isolation_level=None, timeout=5,
+                           check_same_thread=check_same_thread)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    _init_db(conn)
+    return conn
+
+def get_db():
+    """Koneksi SQLite per thread untuk write (thread MQTT worker/flusher)"""
+    conn = getattr(_db_local, 'conn', None)
+    if conn is None:
+        conn = _db_local.conn = _connect()
+    return conn
+
+@cache_resource(show_spinner=False)
+def _get_read_db():
+    """
+    Satu koneksi baca untuk seluruh proses: (conn, lock, cache latest_state).
+    Setiap rerun/fragment Streamlit jalan di thread baru, jadi koneksi per thread
+    tidak pernah dipakai ulang untuk polling dashboard. Query dijalankan di bawah lock.
+    """
+    return _connect(check_same_thread=False), threading.Lock(), {}
+
+# Payload terakhir yang ditulis per nama state (dari proses ini)
+_last_saved_payload = {}
+
+def _save_state(name, data):
+    """UPSERT satu baris latest_state (dilewati jika payload sama persis dengan write terakhir)"""
+    payload = json_dumps(data)
+    if _last_saved_payload.get(name) == payload:
+        return
+    # Write lewat koneksi per thread: data_version koneksi baca ikut berubah
+    get_db().execute(_UPSERT_STATE_SQL, (name, payload))
+    _last_saved_payload[name] = payload
+
+def _load_state(name):
+    """
+    Load satu baris latest_state, None jika belum ada.
+    Hasil di-cache di koneksi baca bersama selama PRAGMA data_version tidak berubah
+    (tidak ada commit dari koneksi lain), jadi polling dashboard tanpa
+    perubahan tidak query + parse JSON ulang.
+    """
+    conn, lock, state_cache = _get_read_db()
+    with lock:
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        cached = state_cache.get(name)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        row = conn.execute("SELECT payload FROM latest_state WHERE name = ?", (name,)).fetchone()
+        data = json_loads(row[0]) if row else None
+        state_cache[name] = (version, data)
+        return data
 
+# Ring buffer baris log di memory, ditulis ke DB oleh flush_log()
+_log_buffer = deque(maxlen=LOG_BUFFER_MAXLEN)
+_LABEL_INDEXES = tuple((col, LOG_COLUMNS.index(col)) for col in LABEL_COLUMNS)
+_log_buffer_lock = threading.Lock()
+_last_log_flush = time.time()
+
+def _build_log_row(data, status, timestamp):
+    """Susun satu baris log sebagai tuple berurutan LOG_COLUMNS (parameter positional INSERT)"""
+    return (
+        timestamp,
+        float(data.get("ph", 0)),
+        float(data.get("tds", 0)),
+        float(data.get("water_flow", 0)),
+        float(data.get("air_humidity", 0)),
+        float(data.get("air_temperature", 0)),
+        float(data.get("ldr_value", 0)),
+        float(data.get("water_temperature", 0)),
+        float(data.get("water_level", 0)),
+        data.get("ph_label", "Unknown"),
+        data.get("tds_label", "Unknown"),
+        data.get("ambient_label", "Unknown"),
+        data.get("light_label", "Unknown"),
+        status
+    )
+
+def log_predictions(records):
+    """Tampung banyak hasil prediksi (list of (data, status)) di buffer log"""
+    try:
+        timestamp = datetime.now().strftime(TIMESTAMP_FORMAT)
+        rows = [_build_log_row(data, status, data.get("timestamp", timestamp)) for data, status in records]
+        with _log_buffer_lock:
+            dropped = len(_log_buffer) + len(rows) - LOG_BUFFER_MAXLEN
+            if dropped > 0:
+                print(f"⚠️ Buffer log penuh, {dropped} baris tertua dibuang")
+            _log_buffer.extend(rows)
         return True
     except Exception as e:
         print(f"Error saat logging: {e}")
         return False
 
+def should_flush_log():
+    """True jika buffer log sudah penuh atau flush terakhir sudah terlalu lama"""
+    with _log_buffer_lock:
+        if not _log_buffer:
+            return False
+        return (len(_log_buffer) >= LOG_FLUSH_MAX_ROWS
+                or time.time() - _last_log_flush >= LOG_FLUSH_INTERVAL_SECONDS)
+
+def flush_log():
+    """Insert semua baris di buffer ke tabel readings dalam satu transaksi"""
+    global _last_log_flush
+    with _log_buffer_lock:
+        _last_log_flush = time.time()
+        if not _log_buffer:
+            return True
+
+        conn = None
+        try:
+            conn = get_db()
+            conn.execute("BEGIN")
+            conn.executemany(_INSERT_READING_SQL, _log_buffer)
+            batch_counts = Counter((col, row[i]) for row in _log_buffer for col, i in _LABEL_INDEXES)
+            conn.executemany(_INCREMENT_COUNT_SQL,
+                             ((col, label, n) for (col, label), n in batch_counts.items()))
+            conn.execute("COMMIT")
+            _log_buffer.clear()
+            return True
+        except Exception as e:
+            if conn is not None and conn.in_transaction:
+                conn.execute("ROLLBACK")
+            print(f"Error saat logging: {e}")
+            return False
+
+def log_prediction(data, status):
+    """Simpan hasil prediksi dengan semua 4 labels ke log"""
+    return log_predictions([(data, status)])
+
 def load_latest_prediction():
-    """Load latest prediction dari file JSON"""
+    """Load latest prediction dari state DB"""
     try:
-        if os.path.exists(LATEST_JSON):
-            with open(LATEST_JSON, 'r') as f:
-                return json.load(f)
+        return _load_state('prediction')
     except Exception:
-        pass
-    return None
+        return None
 
 def save_latest_prediction(data):
-    """Save latest prediction ke file JSON"""
+    """Save latest prediction ke state DB"""
     try:
-        with open(LATEST_JSON, 'w') as f:
-            json.dump(data, f)
+        _save_state('prediction', data)
         return True
     except Exception as e:
-        print(f"✗ Gagal simpan latest json: {e}")
+        print(f"✗ Gagal simpan latest prediction: {e}")
         return False
 
+def get_log_version():
+    """Penanda versi log (rowid terakhir), berubah setiap ada baris baru"""
+    try:
+        conn, lock, _ = _get_read_db()
+        with lock:
+            return conn.execute("SELECT MAX(rowid) FROM readings").fetchone()[0]
+    except Exception:
+        return None
+
+def load_label_counts():
+    """Jumlah baris per label untuk tiap kolom LABEL_COLUMNS: {kolom: {label: count}}"""
+    counts = {col: {} for col in LABEL_COLUMNS}
+    try:
+        conn, lock, _ = _get_read_db()
+        with lock:
+            rows = conn.execute(
+                "SELECT column_name, label, count FROM label_counts ORDER BY count DESC").fetchall()
+        for col, label, count in rows:
+            if col in counts:
+                counts[col][label] = count
+    except Exception as e:
+        print(f"Error loading label counts: {e}")
+    return counts
+
 def load_log_data():
-    """Load log data dari CSV"""
+    """Load log data dari tabel readings"""
     try:
-        if os.path.exists(LOG_FILE):
-            return pd.read_csv(LOG_FILE)
+        conn, lock, _ = _get_read_db()
+        with lock:
+            return pd.read_sql_query(
+                f"SELECT {', '.join(LOG_COLUMNS)} FROM readings ORDER BY rowid",
+                conn, dtype=LOG_DTYPES,
+                parse_dates={'timestamp': TIMESTAMP_FORMAT}  # format tetap: parse cepat tanpa inferensi
+            )
     except Exception as e:
         print(f"Error loading log: {e}")
     return pd.DataFrame()
 
+def read_log_bytes():
+    """Export seluruh log sebagai CSV (bytes) untuk download"""
+    try:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator='\n')
+        writer.writerow(LOG_COLUMNS)
+        conn, lock, _ = _get_read_db()
+        with lock:
+            writer.writerows(conn.execute(f"SELECT {', '.join(LOG_COLUMNS)} FROM readings ORDER BY rowid"))
+        return buffer.getvalue().encode()
+    except Exception as e:
+        print(f"Error export log: {e}")
+        return b""
+
 # NEW: Actuator functions
 def load_latest_actuator():
-    """Load latest actuator status dari file JSON"""
+    """Load latest actuator status dari state DB"""
     try:
-        if os.path.exists(LATEST_ACTUATOR_JSON):
-            with open(LATEST_ACTUATOR_JSON, 'r') as f:
-                return json.load(f)
+        return _load_state('actuator')
     except Exception:
-        pass
-    return None
+        return None
 
 def save_latest_actuator(data):
-    """Save latest actuator status ke file JSON"""
+    """Save latest actuator status ke state DB"""
     try:
-        with open(LATEST_ACTUATOR_JSON, 'w') as f:
-            json.dump(data, f)
+        _save_state('actuator', data)
         return True
     except Exception as e:
-        print(f"✗ Gagal simpan actuator json: {e}")
-        return False
\ No newline at end of file
+        print(f"✗ Gagal simpan actuator state: {e}")
+        return False
@@ -1,64 +1,160 @@
 """
 ML Model handling untuk IoT Hydroponics Dashboard
 """
+import functools
+from collections import OrderedDict
 import streamlit as st
 import joblib
-import pandas as pd
-from config import MODEL_PATH, PH_LABELS, TDS_LABELS, AMBIENT_LABELS, LIGHT_LABELS
+import numpy as np
+from config import (MODEL_PATH, PH_LABELS, TDS_LABELS, AMBIENT_LABELS, LIGHT_LABELS,
+                    PREDICT_CACHE_MAXSIZE)
+from utils import safe_float
+
+try:
+    from numba import njit
+except ImportError:  # numba opsional, fallback ke numpy biasa
+    njit = None
+
+# Urutan fitur sesuai saat training
+FEATURE_ORDER = ("ph", "tds", "water_temperature", "air_humidity", "air_temperature", "ldr_value")
+
+# Resolusi key cache prediksi = resolusi sensor (urutan FEATURE_ORDER):
+# pH/suhu/humidity 0.01, TDS/LDR 1. Hanya untuk key, prediksi tetap pakai nilai asli.
+QUANTIZE_STEPS = np.array([0.01, 1, 0.01, 0.01, 0.01, 1], dtype=np.float64)
+
+# Cache LRU hasil prediksi: (id model, kode fitur terkuantisasi) -> dict labels
+_prediction_cache = OrderedDict()
+
+def _prepare_model(model):
+    """
+    Cek urutan fitur sekali saat load, lalu lepas feature_names_in_ supaya
+    predict bisa langsung pakai numpy array tanpa warning feature names.
+    """
+    for estimator in [model, *getattr(model, 'estimators_', [])]:
+        feature_names = getattr(estimator, 'feature_names_in_', None)
+        if feature_names is not None:
+            if tuple(feature_names) != FEATURE_ORDER:
+                raise ValueError(f"Urutan fitur model tidak sesuai: {list(feature_names)}")
+            del estimator.feature_names_in_
+        if hasattr(estimator, 'verbose'):
+            estimator.verbose = 0
+    return model
+
+def extract_features(payload, out=None):
+    """
+    Ambil vektor fitur float64 (urutan FEATURE_ORDER) dari payload sensor.
+    Field yang tidak numerik (mis. "abc" / null) diisi NaN supaya barisnya diprediksi 'Error'.
+    Jika out diberikan (mis. satu baris matriks batch), fitur ditulis langsung ke situ.
+    """
+    if out is None:
+        out = np.empty(len(FEATURE_ORDER), dtype=np.float64)
+    for i, col in enumerate(FEATURE_ORDER):
+        out[i] = safe_float(payload.get(col, 0), default=np.nan)
+    return out
+
+if njit is not None:
+    @njit(cache=True, fastmath=True)
+    def _pack(features):
+        """Copy fitur (n, 6) float64 ke buffer float32 contiguous untuk model"""
+        out = np.empty(features.shape, np.float32)
+        for i in range(features.shape[0]):
+            for j in range(features.shape[1]):
+                out[i, j] = features[i, j]
+        return out
+else:
+    def _pack(features):
+        """Copy fitur (n, 6) float64 ke buffer float32 contiguous untuk model"""
+        return np.ascontiguousarray(features, dtype=np.float32)
+
+@functools.lru_cache(maxsize=1)
+def _inner_load():
+    """
+    Deserialize model sekali per proses. st.cache_resource bisa di-clear saat
+    hot-reload, tapi objek model yang sama tetap dipakai (juga oleh userdata MQTT).
+    """
+    return _prepare_model(joblib.load(MODEL_PATH))
 
 @st.cache_resource
 def load_model():
     """Load model ML dari file pkl (joblib)"""
     try:
-        model = joblib.load(MODEL_PATH)
+        model = _inner_load()
         print(f"✓ Model berhasil di-load dari {MODEL_PATH}")
         return model
     except Exception as e:
         print(f"✗ Gagal load model: {e}")
         return None
 
-def predict_condition(payload, model):
+
+def _fallback_result(label):
+    """Result dengan semua label diisi nilai yang sama (Unknown/Error)"""
+    return {
+        'ph_label': label,
+        'tds_label': label,
+        'ambient_label': label,
+        'light_label': label
+    }
+
+def _prediction_result(prediction):
+    """Dict labels dari satu baris prediksi [ph_label, tds_label, ambient_label, light_label]"""
+    return {
+        'ph_label': PH_LABELS.get(prediction[0], 'Unknown'),
+        'tds_label': TDS_LABELS.get(prediction[1], 'Unknown'),
+        'ambient_label': AMBIENT_LABELS.get(prediction[2], 'Unknown'),
+        'light_label': LIGHT_LABELS.get(prediction[3], 'Unknown'),
+        'ph_value': prediction[0],
+        'tds_value': prediction[1],
+        'ambient_value': prediction[2],
+        'light_value': prediction[3]
+    }
+
+def predict_conditions(features, model):
     """
-    Prediksi kondisi berdasarkan payload lengkap (multifeature).
-    Returns: dict dengan 4 labels atau "Unknown" jika model None
+    Prediksi batch fitur (array (n, 6) urutan FEATURE_ORDER, lihat extract_features).
+    Key cache = fitur dibulatkan ke QUANTIZE_STEPS (resolusi sensor); baris yang hasilnya
+    sudah ada di cache tidak diprediksi ulang, sisanya diprediksi (dengan nilai asli)
+    dengan satu panggilan model.predict.
+    Baris dengan fitur tidak valid (NaN/inf) langsung diberi label 'Error' tanpa masuk model.
+    Returns: list dict dengan 4 labels (urutan sama dengan baris features, read-only)
     """
     try:
         if model is None:
-            return {
-                'ph_label': 'Unknown',
-                'tds_label': 'Unknown', 
-                'ambient_label': 'Unknown',
-                'light_label': 'Unknown'
-            }
-
-        # Pastikan hanya fitur yang dipakai untuk training
-        input_data = pd.DataFrame([{
-            "ph": float(payload.get("ph", 0)),
-            "tds": float(payload.get("tds", 0)),
-            "water_temperature": float(payload.get("water_temperature", 0)),
-            "air_humidity": float(payload.get("air_humidity", 0)),
-            "air_temperature": float(payload.get("air_temperature", 0)),
-            "ldr_value": float(payload.get("ldr_value", 0))
-        }])
-
-        # Prediksi menghasilkan array [ph_label, tds_label, ambient_label, light_label]
-        prediction = model.predict(input_data)[0]
-        
-        return {
-            'ph_label': PH_LABELS.get(prediction[0], 'Unknown'),
-            'tds_label': TDS_LABELS.get(prediction[1], 'Unknown'),
-            'ambient_label': AMBIENT_LABELS.get(prediction[2], 'Unknown'),
-            'light_label': LIGHT_LABELS.get(prediction[3], 'Unknown'),
-            'ph_value': prediction[0],
-            'tds_value': prediction[1],
-            'ambient_value': prediction[2],
-            'light_value': prediction[3]
-        }
+            return [_fallback_result('Unknown') for _ in features]
+
+        codes = np.rint(features / QUANTIZE_STEPS)
+        model_id = id(model)
+
+        results = [None] * len(codes)
+        keys = [None] * len(codes)
+        missing = []
+        for i, (row, finite) in enumerate(zip(codes.tolist(), np.isfinite(codes).all(axis=1))):
+            if not finite:
+                results[i] = _fallback_result('Error')
+                continue
+            keys[i] = (model_id, *row)
+            cached = _prediction_cache.get(keys[i])
+            if cached is not None:
+                _prediction_cache.move_to_end(keys[i])
+                results[i] = cached
+            else:
+                missing.append(i)
+
+        if missing:
+            predictions = model.predict(_pack(features[missing]))
+            for i, prediction in zip(missing, predictions):
+                results[i] = _prediction_result(prediction)
+                _prediction_cache[keys[i]] = results[i]
+            while len(_prediction_cache) > PREDICT_CACHE_MAXSIZE:
+                _prediction_cache.popitem(last=False)
+
+        return results
     except Exception as e:
         print(f"Error saat prediksi: {e}")
-        return {
-            'ph_label': 'Error',
-            'tds_label': 'Error',
-            'ambient_label': 'Error',
-            'light_label': 'Error'
-        }
\ No newline at end of file
+        return [_fallback_result('Error') for _ in features]
+
+def predict_condition(payload, model):
+    """
+    Prediksi kondisi berdasarkan payload lengkap (multifeature).
+    Returns: dict dengan 4 labels atau "Unknown" jika model None
+    """
+    return predict_conditions(extract_features(payload)[np.newaxis, :], model)[0]
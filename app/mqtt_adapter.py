@@ -0,0 +1,184 @@
+"""
+MQTT client adapter untuk IoT Hydroponics Dashboard
+Backend: paho-mqtt (default, thread network sendiri) atau gmqtt (asyncio, opsional)
+"""
+import asyncio
+import threading
+from abc import ABC, abstractmethod
+import paho.mqtt.client as mqtt
+
+try:
+    import gmqtt
+except ImportError:  # gmqtt opsional, fallback ke paho-mqtt
+    gmqtt = None
+
+try:
+    import uvloop
+except ImportError:  # uvloop opsional, fallback ke event loop asyncio biasa
+    uvloop = None
+
+class MqttAdapter(ABC):
+    """
+    Interface minimal client MQTT yang dipakai mqtt_handler.
+    on_message(topic, payload_bytes) dipanggil untuk setiap message,
+    on_connect() setiap kali (re)connect setelah topics di-subscribe.
+    """
+
+    def __init__(self, client_id, topics, on_message, on_connect=None):
+        self.client_id = client_id
+        self.topics = tuple(topics)
+        self.on_message = on_message
+        self.on_connect = on_connect
+
+    @abstractmethod
+    def connect(self, host, port, keepalive=60):
+        """Connect ke broker dan mulai network loop di background"""
+
+    @abstractmethod
+    def publish(self, topic, payload, qos=0):
+        """Publish payload (bytes/str) ke topic"""
+
+    @abstractmethod
+    def is_connected(self):
+        """True jika sedang terhubung ke broker"""
+
+    @abstractmethod
+    def stop(self):
+        """Stop network loop & disconnect"""
+
+    def _connected(self):
+        """Dipanggil backend setelah connect berhasil dan topics di-subscribe"""
+        for topic in self.topics:
+            print(f"📡 Subscribed to: {topic}")
+        if self.on_connect is not None:
+            self.on_connect()
+
+class PahoAdapter(MqttAdapter):
+    """Adapter paho-mqtt (loop_start: thread network paho)"""
+
+    def __init__(self, client_id, topics, on_message, on_connect=None):
+        super().__init__(client_id, topics, on_message, on_connect)
+        try:
+            self._client = mqtt.Client(
+                callback_api_version=mqtt.CallbackAPIVersion.VERSION2,
+                client_id=client_id
+            )
+        except Exception:
+            self._client = mqtt.Client(client_id=client_id)
+
+        self._client.on_connect = self._handle_connect
+        self._client.on_message = self._handle_message
+        self._client.on_disconnect = self._handle_disconnect
+
+    def _handle_connect(self, client, userdata, flags, rc, properties=None):
+        """Callback saat koneksi berhasil"""
+        if rc == 0:
+            print(f"✓ Connected to MQTT Broker")
+            for topic in self.topics:
+                client.subscribe(topic)
+            self._connected()
+        else:
+            print(f"✗ Connection failed: {rc}")
+
+    def _handle_message(self, client, userdata, msg):
+        """Callback saat terima message"""
+        self.on_message(msg.topic, msg.payload)
+
+    def _handle_disconnect(self, client, userdata, *args):
+        """Callback saat disconnect (signature v1: rc, v2: flags, rc, properties)"""
+        rc = args[1] if len(args) > 2 else args[0]
+        if rc != 0:
+            print(f"⚠️ Disconnected: {rc}")
+
+    def connect(self, host, port, keepalive=60):
+        self._client.connect(host, port, keepalive)
+        self._client.loop_start()
+
+    def publish(self, topic, payload, qos=0):
+        return self._client.publish(topic, payload, qos=qos)
+
+    def is_connected(self):
+        return self._client.is_connected()
+
+    def stop(self):
+        self._client.loop_stop()
+        self._client.disconnect()
+
+class GmqttAdapter(MqttAdapter):
+    """Adapter gmqtt: client asyncio di event loop thread sendiri (uvloop jika tersedia)"""
+
+    CONNECT_TIMEOUT_SECONDS = 10
+
+    def __init__(self, client_id, topics, on_message, on_connect=None):
+        if gmqtt is None:
+            raise ImportError("gmqtt belum ter-install (pip install gmqtt)")
+        super().__init__(client_id, topics, on_message, on_connect)
+        self._loop = uvloop.new_event_loop() if uvloop is not None else asyncio.new_event_loop()
+        self._thread = None
+        self._client = gmqtt.Client(client_id)
+        self._client.on_connect = self._handle_connect
+        self._client.on_message = self._handle_message
+        self._client.on_disconnect = self._handle_disconnect
+
+    def _handle_connect(self, client, flags, rc, properties):
+        """Callback saat koneksi berhasil (dipanggil di event loop)"""
+        print(f"✓ Connected to MQTT Broker")
+        for topic in self.topics:
+            client.subscribe(topic, qos=0)
+        self._connected()
+
+    def _handle_message(self, client, topic, payload, qos, properties):
+        """Callback saat terima message (dipanggil di event loop)"""
+        self.on_message(topic, payload)
+        return 0
+
+    def _handle_disconnect(self, client, packet, exc=None):
+        """Callback saat disconnect"""
+        if exc is not None:
+            print(f"⚠️ Disconnected: {exc}")
+
+    def connect(self, host, port, keepalive=60):
+        self._thread = threading.Thread(target=self._loop.run_forever, name="gmqtt-loop", daemon=True)
+        self._thread.start()
+        future = asyncio.run_coroutine_threadsafe(
+            self._client.connect(host, port, keepalive=keepalive), self._loop
+        )
+        try:
+            future.result(timeout=self.CONNECT_TIMEOUT_SECONDS)
+        except BaseException:
+            # Gagal/timeout: batalkan connect, stop loop & thread supaya tidak bocor
+            future.cancel()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=self.CONNECT_TIMEOUT_SECONDS)
+            if not self._thread.is_alive():
+                self._close_loop()
+            raise
+
+    def _close_loop(self):
+        """Selesaikan task yang sedang di-cancel lalu tutup event loop (thread loop sudah berhenti)"""
+        try:
+            pending = asyncio.all_tasks(self._loop)
+            if pending:
+                self._loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+        finally:
+            self._loop.close()
+
+    def publish(self, topic, payload, qos=0):
+        # gmqtt tidak thread-safe: publish dijadwalkan ke event loop
+        self._loop.call_soon_threadsafe(self._client.publish, topic, payload, qos)
+
+    def is_connected(self):
+        return self._client.is_connected
+
+    def stop(self):
+        future = asyncio.run_coroutine_threadsafe(self._client.disconnect(), self._loop)
+        future.result(timeout=self.CONNECT_TIMEOUT_SECONDS)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+def create_mqtt_adapter(backend, client_id, topics, on_message, on_connect=None):
+    """Buat adapter sesuai backend ("paho" / "gmqtt"), fallback ke paho jika gmqtt tidak ada"""
+    if backend == "gmqtt":
+        if gmqtt is not None:
+            return GmqttAdapter(client_id, topics, on_message, on_connect)
+        print("⚠️ gmqtt tidak tersedia, pakai paho-mqtt")
+    return PahoAdapter(client_id, topics, on_message, on_connect)
@@ -1,205 +1,369 @@
 """
 MQTT handling untuk IoT Hydroponics Dashboard
 """
-import os
-import json
 import time
+import atexit
+import functools
+import queue
+import threading
+from itertools import product
+import numpy as np
 from turtle import st
-import paho.mqtt.client as mqtt
+from streamlit import cache_resource
 from datetime import datetime
 from config import (MQTT_BROKER, MQTT_PORT, MQTT_TOPIC_SENSOR, MQTT_TOPIC_OUTPUT, 
-                   MQTT_TOPIC_ACTUATOR, DEFAULT_LOG_INTERVAL_SECONDS, FLAG_FILE)
-from model_handler import predict_condition
-from data_logger import log_prediction, save_latest_prediction, save_latest_actuator
-from utils import safe_float
-
-def on_connect(client, userdata, flags, rc, properties=None):
-    """Callback saat koneksi berhasil"""
-    if rc == 0:
-        print(f"✓ Connected to MQTT Broker")
-        client.subscribe(MQTT_TOPIC_SENSOR)
-        client.subscribe(MQTT_TOPIC_ACTUATOR)  # NEW: Subscribe to actuator topic
-        print(f"📡 Subscribed to: {MQTT_TOPIC_SENSOR}")
-        print(f"📡 Subscribed to: {MQTT_TOPIC_ACTUATOR}")
-    else:
-        print(f"✗ Connection failed: {rc}")
+                   MQTT_TOPIC_ACTUATOR, MQTT_CLIENT_BACKEND, DEFAULT_LOG_INTERVAL_SECONDS,
+                   PREDICT_BATCH_SIZE, PREDICT_BATCH_WINDOW_SECONDS, MESSAGE_QUEUE_MAXSIZE,
+                   LATEST_FLUSH_INTERVAL_SECONDS, TIMESTAMP_FORMAT,
+                   PH_LABELS, TDS_LABELS, AMBIENT_LABELS, LIGHT_LABELS)
+from model_handler import predict_conditions, extract_features, FEATURE_ORDER
+from data_logger import (log_predictions, should_flush_log, flush_log,
+                         save_latest_prediction, save_latest_actuator)
+from mqtt_adapter import create_mqtt_adapter
+from utils import safe_float, json_loads, json_dumps
 
-def on_message(client, userdata, msg):
-    """Callback saat terima message"""
-    try:
-        # NEW: Handle actuator status messages
-        if msg.topic == MQTT_TOPIC_ACTUATOR:
-            actuator_data = json.loads(msg.payload.decode())
-            actuator_data['timestamp'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            save_latest_actuator(actuator_data)
-            print(f"[{datetime.now().strftime('%H:%M:%S')}] 🔧 Actuator Status Updated")
+# Topic yang di-subscribe adapter setiap (re)connect
+SUBSCRIBE_TOPICS = (
+    MQTT_TOPIC_SENSOR,
+    MQTT_TOPIC_ACTUATOR  # NEW: Subscribe to actuator topic
+)
+
+def on_connect():
+    """Callback saat koneksi berhasil (topics sudah di-subscribe oleh adapter)"""
+    global _last_output_sig
+    _last_output_sig = None  # Publish ulang output pertama setelah (re)connect
+
+# Status keseluruhan: (output, icon, color, status), diindex dengan kode status
+STATUS_META = (
+    ("ALERT_CRITICAL", "🚨", "red", "Critical"),
+    ("ALL_NORMAL", "✅", "green", "Optimal"),
+    ("NEEDS_ATTENTION", "⚠️", "orange", "Warning")
+)
+STATUS_CRITICAL, STATUS_OPTIMAL, STATUS_WARNING = range(len(STATUS_META))
+
+# Label pH/TDS yang dianggap kritis, dibuat sekali saat import
+CRITICAL_LEVEL_LABELS = frozenset({'Too Low', 'Too High'})
+OPTIMAL_LABELS = ('Normal', 'Normal', 'Ideal', 'Normal')
+
+def classify_status(ph_label, tds_label, ambient_label, light_label):
+    """Tentukan kode status keseluruhan (index STATUS_META) dari 4 label"""
+    if (ph_label in CRITICAL_LEVEL_LABELS or tds_label in CRITICAL_LEVEL_LABELS
+            or ambient_label == 'Bad'):
+        return STATUS_CRITICAL
+    elif (ph_label, tds_label, ambient_label, light_label) == OPTIMAL_LABELS:
+        return STATUS_OPTIMAL
+    return STATUS_WARNING
+
+def _build_status_table():
+    """Hitung kode status untuk semua kombinasi label index sekali saat import"""
+    table = np.empty((len(PH_LABELS), len(TDS_LABELS), len(AMBIENT_LABELS), len(LIGHT_LABELS)), dtype=np.uint8)
+    for (p, ph), (t, tds), (a, ambient), (l, light) in product(
+            PH_LABELS.items(), TDS_LABELS.items(), AMBIENT_LABELS.items(), LIGHT_LABELS.items()):
+        table[p, t, a, l] = classify_status(ph, tds, ambient, light)
+    return table
+
+# STATUS_TABLE[ph_value, tds_value, ambient_value, light_value] -> kode status
+STATUS_TABLE = _build_status_table()
+
+# Signature (status + 4 label) dari output terakhir yang dipublish
+_last_output_sig = None
+
+# Antrian (topic, payload bytes) dari thread network paho, diproses per batch oleh worker
+_message_queue = queue.Queue(maxsize=MESSAGE_QUEUE_MAXSIZE)
+_worker_started = False
+# (client, userdata) aktif yang dipakai worker; di-update setiap client baru dibuat
+_worker_target = None
+
+# State latest prediction di memory, ditulis ke state DB oleh flusher thread
+_latest_state = {}
+_latest_lock = threading.Lock()
+_latest_dirty = False
+_latest_flusher_started = False
+
+def update_latest_state(data):
+    """Update latest state di memory (tanpa file I/O di callback MQTT)"""
+    global _latest_dirty
+    with _latest_lock:
+        _latest_state.update(data)
+        _latest_dirty = True
+
+def flush_latest_state():
+    """Simpan snapshot latest state ke state DB jika ada perubahan"""
+    global _latest_dirty
+    with _latest_lock:
+        if not _latest_dirty:
             return
+        snapshot = dict(_latest_state)
+        _latest_dirty = False
+    save_latest_prediction(snapshot)
+
+def _latest_flusher_loop():
+    """
+    Loop flusher thread: flush latest state setiap LATEST_FLUSH_INTERVAL_SECONDS,
+    dan buffer log jika sudah melewati LOG_FLUSH_INTERVAL_SECONDS walau tidak ada
+    message sensor baru (baris terakhir tetap masuk DB saat trafik berhenti)
+    """
+    while True:
+        time.sleep(LATEST_FLUSH_INTERVAL_SECONDS)
+        flush_latest_state()
+        if should_flush_log():
+            flush_log()
+
+def start_latest_flusher():
+    """Start flusher thread (sekali per proses)"""
+    global _latest_flusher_started
+    if _latest_flusher_started:
+        return
+    _latest_flusher_started = True
+    threading.Thread(target=_latest_flusher_loop, name="latest-flusher", daemon=True).start()
+    atexit.register(flush_latest_state)
+
+def on_message(topic, payload):
+    """Callback saat terima message: cukup masukkan ke antrian, diproses oleh worker"""
+    item = (topic, payload)
+    try:
+        _message_queue.put_nowait(item)
+    except queue.Full:
+        # Antrian penuh: buang message tertua, data terbaru lebih berguna
+        try:
+            _message_queue.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            _message_queue.put_nowait(item)
+        except queue.Full:
+            pass
+        print(f"⚠️ Message queue penuh, message tertua dibuang")
+
+def drain_batch():
+    """
+    Ambil satu batch message dari antrian: tunggu message pertama, lalu kumpulkan
+    sampai PREDICT_BATCH_SIZE message atau PREDICT_BATCH_WINDOW_SECONDS habis.
+    """
+    batch = [_message_queue.get()]
+    deadline = time.monotonic() + PREDICT_BATCH_WINDOW_SECONDS
+    while len(batch) < PREDICT_BATCH_SIZE:
+        timeout = deadline - time.monotonic()
+        if timeout <= 0:
+            break
+        try:
+            batch.append(_message_queue.get(timeout=timeout))
+        except queue.Empty:
+            break
+    return batch
+
+def process_batch(client, userdata, batch):
+    """Proses satu batch message: actuator disimpan, sensor diprediksi sekaligus"""
+    # Satu timestamp untuk seluruh batch (message di batch diterima dalam <= PREDICT_BATCH_WINDOW_SECONDS)
+    timestamp = datetime.now().strftime(TIMESTAMP_FORMAT)
+    payloads = []
+    for topic, raw_payload in batch:
+        try:
+            payload = json_loads(raw_payload)
+            if not isinstance(payload, dict):
+                raise ValueError(f"payload bukan JSON object ({type(payload).__name__})")
+
+            # NEW: Handle actuator status messages
+            if topic == MQTT_TOPIC_ACTUATOR:
+                payload['timestamp'] = timestamp
+                save_latest_actuator(payload)
+                print(f"[{timestamp[11:]}] 🔧 Actuator Status Updated")
+                continue
+
+            payloads.append(payload)
+        except Exception as e:
+            print(f"✗ Error on_message: {e}")
+
+    if payloads:
+        predict_pending(client, userdata, payloads, timestamp)
+
+def _message_worker_loop():
+    """
+    Loop worker thread: drain antrian per batch (error satu batch tidak menghentikan worker).
+    Client & userdata diambil ulang per batch, jadi selalu memakai client yang terakhir dibuat.
+    """
+    while True:
+        try:
+            batch = drain_batch()
+            client, userdata = _worker_target
+            process_batch(client, userdata, batch)
+        except Exception as e:
+            print(f"✗ Error worker MQTT: {e}")
+
+def start_message_worker(client, userdata):
+    """Arahkan worker ke client ini; thread worker sendiri di-start sekali per proses"""
+    global _worker_started, _worker_target
+    _worker_target = (client, userdata)
+    if _worker_started:
+        return
+    _worker_started = True
+    threading.Thread(target=_message_worker_loop, name="mqtt-worker", daemon=True).start()
+    atexit.register(_shutdown_current_client)
 
-        # Handle sensor data messages
-        payload = json.loads(msg.payload.decode())
-
-        # Ambil semua sensor dari payload
-        ph = safe_float(payload.get("ph", 0))
-        tds = safe_float(payload.get("tds", 0))
-        water_flow = safe_float(payload.get("water_flow", 0))
-        air_humidity = safe_float(payload.get("air_humidity", 0))
-        air_temperature = safe_float(payload.get("air_temperature", 0))
-        ldr = safe_float(payload.get("ldr_value", 0))
-        water_temperature = safe_float(payload.get("water_temperature", 0))
-        water_level = safe_float(payload.get("water_level", 0))
-
-        print(f"[{datetime.now().strftime('%H:%M:%S')}] 📥 pH: {ph} | TDS: {tds} | WaterT: {water_temperature}°C | AirT: {air_temperature}°C | Hum: {air_humidity}% | LDR: {ldr}")
-
-        # Ambil model dari userdata
-        model = userdata.get('model') if isinstance(userdata, dict) else None
-
-        # Prediksi
-        prediction_result = predict_condition(payload, model)
-        
-        # Extract labels
-        ph_label = prediction_result.get('ph_label', 'Unknown')
-        tds_label = prediction_result.get('tds_label', 'Unknown')
-        ambient_label = prediction_result.get('ambient_label', 'Unknown')
-        light_label = prediction_result.get('light_label', 'Unknown')
-        
-        # Tentukan status keseluruhan
-        critical_ph = ph_label in ['Too Low', 'Too High']
-        critical_tds = tds_label in ['Too Low', 'Too High']
-        critical_ambient = ambient_label == 'Bad'
-        
-        if critical_ph or critical_tds or critical_ambient:
-            output = "ALERT_CRITICAL"
-            icon = "🚨"
-            color = "red"
-            status = "Critical"
-        elif ph_label == 'Normal' and tds_label == 'Normal' and ambient_label == 'Ideal' and light_label == 'Normal':
-            output = "ALL_NORMAL"
-            icon = "✅"
-            color = "green"
-            status = "Optimal"
-        else:
-            output = "NEEDS_ATTENTION"
-            icon = "⚠️"
-            color = "orange"
-            status = "Warning"
-
-        # Publish output
+def predict_pending(client, userdata, payloads, timestamp):
+    """Prediksi semua payload sensor di batch dengan satu panggilan model.predict"""
+    # Ambil model dari userdata
+    model = userdata.get('model') if isinstance(userdata, dict) else None
+
+    # Isi matriks fitur (B, 6) langsung per baris, lalu prediksi sekali
+    features = np.empty((len(payloads), len(FEATURE_ORDER)), dtype=np.float64)
+    for row, payload in zip(features, payloads):
+        extract_features(payload, out=row)
+    predictions = predict_conditions(features, model)
+
+    log_records = []
+    for payload, row_features, prediction_result in zip(payloads, features, predictions):
+        try:
+            handle_sensor_data(client, userdata, payload, row_features, prediction_result, timestamp, log_records)
+        except Exception as e:
+            print(f"✗ Error on_message: {e}")
+
+    if log_records and log_predictions(log_records):
+        for data, status in log_records:
+            print(f"[{timestamp[11:]}] 💾 LOGGED → {data['ph_label']} | {data['tds_label']} | {data['ambient_label']} | {data['light_label']}")
+
+    if should_flush_log():
+        flush_log()
+
+@functools.lru_cache(maxsize=256)
+def _serialize_output(status, ph_label, tds_label, ambient_label, light_label, action):
+    """JSON bytes output MQTT; kombinasi label terbatas jadi hasilnya di-cache"""
+    return json_dumps({
+        "status": status,
+        "ph": ph_label,
+        "tds": tds_label,
+        "ambient": ambient_label,
+        "light": light_label,
+        "action": action
+    })
+
+def handle_sensor_data(client, userdata, payload, features, prediction_result, timestamp, log_records):
+    """
+    Proses satu payload sensor yang sudah diprediksi: publish output & simpan latest.
+    Jika interval logging sudah lewat, (data, status) ditambahkan ke log_records.
+    """
+    # Sensor fitur model sudah di-extract saat on_message (urutan FEATURE_ORDER)
+    ph, tds, water_temperature, air_humidity, air_temperature, ldr = features.tolist()
+    water_flow = safe_float(payload.get("water_flow", 0))
+    water_level = safe_float(payload.get("water_level", 0))
+
+    print(f"[{timestamp[11:]}] 📥 pH: {ph} | TDS: {tds} | WaterT: {water_temperature}°C | AirT: {air_temperature}°C | Hum: {air_humidity}% | LDR: {ldr}")
+
+    # Extract labels
+    ph_label = prediction_result.get('ph_label', 'Unknown')
+    tds_label = prediction_result.get('tds_label', 'Unknown')
+    ambient_label = prediction_result.get('ambient_label', 'Unknown')
+    light_label = prediction_result.get('light_label', 'Unknown')
+
+    # Tentukan status keseluruhan (lookup table jika ada label index dari model)
+    if 'ph_value' in prediction_result:
+        code = STATUS_TABLE[prediction_result['ph_value'], prediction_result['tds_value'],
+                            prediction_result['ambient_value'], prediction_result['light_value']]
+    else:
+        code = classify_status(ph_label, tds_label, ambient_label, light_label)
+    output, icon, color, status = STATUS_META[code]
+
+    # Publish output hanya jika hasil klasifikasi berubah dari publish terakhir
+    global _last_output_sig
+    sig = (status, ph_label, tds_label, ambient_label, light_label)
+    if sig != _last_output_sig:
         try:
-            output_data = {
-                "status": status,
-                "ph": ph_label,
-                "tds": tds_label,
-                "ambient": ambient_label,
-                "light": light_label,
-                "action": output
-            }
-            client.publish(MQTT_TOPIC_OUTPUT, json.dumps(output_data))
+            client.publish(MQTT_TOPIC_OUTPUT,
+                           _serialize_output(status, ph_label, tds_label, ambient_label, light_label, output))
+            _last_output_sig = sig
         except Exception as e:
             print(f"✗ Gagal publish output: {e}")
 
-        # Logging dengan interval
-        current_time = time.time()
-        log_interval = userdata.get('log_interval', DEFAULT_LOG_INTERVAL_SECONDS) if isinstance(userdata, dict) else DEFAULT_LOG_INTERVAL_SECONDS
-        last_logged_time = userdata.get('last_logged_time', 0) if isinstance(userdata, dict) else 0
-        should_log = (current_time - last_logged_time) >= log_interval
-
-        if should_log:
-            logged = log_prediction({
-                "ph": ph,
-                "tds": tds,
-                "water_flow": water_flow,
-                "air_humidity": air_humidity,
-                "air_temperature": air_temperature,
-                "ldr_value": ldr,
-                "water_temperature": water_temperature,
-                "water_level": water_level,
-                "ph_label": ph_label,
-                "tds_label": tds_label,
-                "ambient_label": ambient_label,
-                "light_label": light_label
-            }, status)
-
-            if isinstance(userdata, dict):
-                userdata['last_logged_time'] = current_time
-                client.user_data_set(userdata)
-
-            if logged:
-                print(f"[{datetime.now().strftime('%H:%M:%S')}] 💾 LOGGED → {ph_label} | {tds_label} | {ambient_label} | {light_label}")
-
-        # Simpan latest_prediction.json
-        data = {
-            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "ph": ph,
-            "tds": tds,
-            "water_flow": water_flow,
-            "air_humidity": air_humidity,
-            "air_temperature": air_temperature,
-            "ldr_value": ldr,
-            "water_temperature": water_temperature,
-            "water_level": water_level,
-            "ph_label": ph_label,
-            "tds_label": tds_label,
-            "ambient_label": ambient_label,
-            "light_label": light_label,
-            "status": status,
-            "output": output,
-            "icon": icon,
-            "color": color
-        }
-        save_latest_prediction(data)
-        if st.session_state.get('auto_control_enabled', False):
-            from actuator_controller import apply_auto_control
-            try:
-                apply_auto_control(prediction_result)
-            except Exception as e:
-                print(f"⚠️ Auto control error: {e}")
+    # Logging dengan interval
+    current_time = time.time()
+    log_interval = userdata.get('log_interval', DEFAULT_LOG_INTERVAL_SECONDS) if isinstance(userdata, dict) else DEFAULT_LOG_INTERVAL_SECONDS
+    last_logged_time = userdata.get('last_logged_time', 0) if isinstance(userdata, dict) else 0
+    should_log = (current_time - last_logged_time) >= log_interval
 
-    except Exception as e:
-        print(f"✗ Error on_message: {e}")
-        
-        
+    # Satu record dipakai untuk log dan (ditambah info status) untuk latest state
+    record = {
+        "timestamp": timestamp,
+        "ph": ph,
+        "tds": tds,
+        "water_flow": water_flow,
+        "air_humidity": air_humidity,
+        "air_temperature": air_temperature,
+        "ldr_value": ldr,
+        "water_temperature": water_temperature,
+        "water_level": water_level,
+        "ph_label": ph_label,
+        "tds_label": tds_label,
+        "ambient_label": ambient_label,
+        "light_label": light_label
+    }
 
-def on_disconnect(client, userdata, rc, properties=None):
-    """Callback saat disconnect"""
-    if rc != 0:
-        print(f"⚠️ Disconnected: {rc}")
+    if should_log:
+        log_records.append((record, status))
 
-def get_mqtt_client(model, log_interval):
-    """Get atau create MQTT client"""
-    if os.path.exists(FLAG_FILE):
-        return None
+        if isinstance(userdata, dict):
+            userdata['last_logged_time'] = current_time
 
-    print("🔌 Creating new MQTT client...")
+    # Update latest state (disimpan ke state DB oleh flusher thread)
+    data = record | {
+        "status": status,
+        "output": output,
+        "icon": icon,
+        "color": color
+    }
+    update_latest_state(data)
+    if st.session_state.get('auto_control_enabled', False):
+        from actuator_controller import apply_auto_control
+        try:
+            apply_auto_control(prediction_result)
+        except Exception as e:
+            print(f"⚠️ Auto control error: {e}")
 
+def _shutdown_client(client):
+    """Stop network loop & disconnect (client di-release dari cache atau proses berhenti)"""
     try:
-        client = mqtt.Client(
-            callback_api_version=mqtt.CallbackAPIVersion.VERSION2,
-            client_id=f"streamlit_iot_{int(time.time())}"
-        )
+        client.stop()
     except Exception:
-        client = mqtt.Client(client_id=f"streamlit_iot_{int(time.time())}")
+        pass
+
+def _shutdown_current_client():
+    """Stop client yang sedang dipakai worker saat proses berhenti"""
+    if _worker_target is not None:
+        _shutdown_client(_worker_target[0])
+
+@cache_resource(show_spinner=False, max_entries=1, on_release=_shutdown_client)
+def _create_mqtt_client(_model, log_interval):
+    """
+    Buat & connect MQTT client, satu per proses (di-cache cache_resource).
+    Client lama di-stop (on_release) saat cache di-clear atau diganti entry baru.
+    Raise jika gagal connect supaya kegagalan tidak ikut di-cache.
+    """
+    print("🔌 Creating new MQTT client...")
+
+    client = create_mqtt_adapter(
+        MQTT_CLIENT_BACKEND,
+        client_id=f"streamlit_iot_{int(time.time())}",
+        topics=SUBSCRIBE_TOPICS,
+        on_message=on_message,
+        on_connect=on_connect
+    )
 
     userdata = {
-        'model': model,
+        'model': _model,
         'log_interval': log_interval,
         'last_logged_time': 0
     }
-    client.user_data_set(userdata)
-
-    client.on_connect = on_connect
-    client.on_message = on_message
-    client.on_disconnect = on_disconnect
-
-    try:
-        client.connect(MQTT_BROKER, MQTT_PORT, 60)
-        client.loop_start()
 
-        with open(FLAG_FILE, 'w') as f:
-            f.write(str(os.getpid()))
+    client.connect(MQTT_BROKER, MQTT_PORT, 60)
+    start_message_worker(client, userdata)
+    start_latest_flusher()
 
-        print(f"✓ MQTT client connected with Log Interval: {log_interval}s")
-        return client
+    print(f"✓ MQTT client connected with Log Interval: {log_interval}s")
+    return client
 
+def get_mqtt_client(model, log_interval):
+    """Get atau create MQTT client (satu client resident per proses)"""
+    try:
+        return _create_mqtt_client(model, log_interval)
     except Exception as e:
         print(f"✗ Failed connect MQTT: {e}")
-        return None
\ No newline at end of file
+        return None
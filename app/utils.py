@@ -1,15 +1,35 @@
 """
 Helper functions untuk IoT Hydroponics Dashboard
 """
+import json
+
+try:
+    import orjson
+except ImportError:  # orjson opsional, fallback ke json stdlib
+    orjson = None
 
 def safe_float(x, default=0.0):
-    """Safely convert value to float"""
+    """Safely convert value to float (fast path untuk float/int dari JSON)"""
+    if type(x) is float:
+        return x
     try:
         return float(x)
-    except:
+    except (TypeError, ValueError, OverflowError):
         return default
 
 def get_label_color(label):
     """Get color for a label"""
     from config import LABEL_COLORS
-    return LABEL_COLORS.get(label, 'gray')
\ No newline at end of file
+    return LABEL_COLORS.get(label, 'gray')
+
+def json_loads(data):
+    """Parse JSON dari bytes/str (pakai orjson jika tersedia)"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def json_dumps(obj):
+    """Serialize object ke JSON bytes (pakai orjson jika tersedia)"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode()
\ No newline at end of file
@@ -1,27 +1,40 @@
 """
 All visualization functions untuk IoT Hydroponics Dashboard
 """
-import pandas as pd
+import copy
+import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 from config import STATUS_COLORS
 
-def create_temperature_trend_chart(df_log):
-    """Create temperature trend chart (air & water temperature)"""
+# Mapping nama trace -> kolom log, dipakai untuk update data figure yang sudah ada
+TREND_TRACE_COLUMNS = {
+    'Air Temp': 'air_temperature',
+    'Water Temp': 'water_temperature',
+    'pH': 'ph',
+    'TDS': 'tds',
+    'Humidity': 'air_humidity',
+    'Light': 'ldr_value',
+    'Water Level': 'water_level',
+    'Water Flow': 'water_flow'
+}
+
+def _build_temperature_trend_chart(df_log):
+    """Create temperature trend chart (air & water temperature) (build penuh dengan validasi Plotly)"""
     if df_log.empty or len(df_log) < 2:
         return None
 
-    df_recent = df_log.tail(30).copy()
-    df_recent['timestamp'] = pd.to_datetime(df_recent['timestamp'])
+    # Timestamp sudah di-parse saat load log, cukup slice array numpy (tanpa copy DataFrame)
+    timestamps = df_log['timestamp'].values[-30:]
 
     fig = make_subplots(specs=[[{"secondary_y": False}]])
 
     # Air Temperature
     fig.add_trace(
-        go.Scatter(
-            x=df_recent['timestamp'],
-            y=df_recent['air_temperature'],
+        go.Scattergl(
+            x=timestamps,
+            y=df_log['air_temperature'].values[-30:],
             mode='lines+markers',
             name='Air Temp',
             line=dict(color='#ff7f0e', width=2),
@@ -31,9 +44,9 @@ def create_temperature_trend_chart(df_log):
 
     # Water Temperature
     fig.add_trace(
-        go.Scatter(
-            x=df_recent['timestamp'],
-            y=df_recent['water_temperature'],
+        go.Scattergl(
+            x=timestamps,
+            y=df_log['water_temperature'].values[-30:],
             mode='lines+markers',
             name='Water Temp',
             line=dict(color='#1f77b4', width=2),
@@ -52,13 +65,12 @@ def create_temperature_trend_chart(df_log):
 
     return fig
 
-def create_ph_tds_chart(df_log):
-    """Create pH and TDS trend chart"""
+def _build_ph_tds_chart(df_log):
+    """Create pH and TDS trend chart (build penuh dengan validasi Plotly)"""
     if df_log.empty or len(df_log) < 2:
         return None
 
-    df_recent = df_log.tail(30).copy()
-    df_recent['timestamp'] = pd.to_datetime(df_recent['timestamp'])
+    timestamps = df_log['timestamp'].values[-30:]
 
     fig = make_subplots(
         rows=2, cols=1,
@@ -68,9 +80,9 @@ def create_ph_tds_chart(df_log):
 
     # pH Chart
     fig.add_trace(
-        go.Scatter(
-            x=df_recent['timestamp'],
-            y=df_recent['ph'],
+        go.Scattergl(
+            x=timestamps,
+            y=df_log['ph'].values[-30:],
             mode='lines+markers',
             name='pH',
             line=dict(color='#2ca02c', width=2),
@@ -83,9 +95,9 @@ def create_ph_tds_chart(df_log):
 
     # TDS Chart
     fig.add_trace(
-        go.Scatter(
-            x=df_recent['timestamp'],
-            y=df_recent['tds'],
+        go.Scattergl(
+            x=timestamps,
+            y=df_log['tds'].values[-30:],
             mode='lines+markers',
             name='TDS',
             line=dict(color='#d62728', width=2),
@@ -108,20 +120,19 @@ def create_ph_tds_chart(df_log):
 
     return fig
 
-def create_humidity_chart(df_log):
-    """Create humidity trend chart"""
+def _build_humidity_chart(df_log):
+    """Create humidity trend chart (build penuh dengan validasi Plotly)"""
     if df_log.empty or len(df_log) < 2:
         return None
 
-    df_recent = df_log.tail(30).copy()
-    df_recent['timestamp'] = pd.to_datetime(df_recent['timestamp'])
+    timestamps = df_log['timestamp'].values[-30:]
 
     fig = go.Figure()
 
     fig.add_trace(
-        go.Scatter(
-            x=df_recent['timestamp'],
-            y=df_recent['air_humidity'],
+        go.Scattergl(
+            x=timestamps,
+            y=df_log['air_humidity'].values[-30:],
             mode='lines+markers',
             name='Humidity',
             line=dict(color='#9467bd', width=2),
@@ -141,20 +152,19 @@ def create_humidity_chart(df_log):
 
     return fig
 
-def create_light_chart(df_log):
-    """Create light (LDR) trend chart"""
+def _build_light_chart(df_log):
+    """Create light (LDR) trend chart (build penuh dengan validasi Plotly)"""
     if df_log.empty or len(df_log) < 2:
         return None
 
-    df_recent = df_log.tail(30).copy()
-    df_recent['timestamp'] = pd.to_datetime(df_recent['timestamp'])
+    timestamps = df_log['timestamp'].values[-30:]
 
     fig = go.Figure()
 
     fig.add_trace(
-        go.Scatter(
-            x=df_recent['timestamp'],
-            y=df_recent['ldr_value'],
+        go.Scattergl(
+            x=timestamps,
+            y=df_log['ldr_value'].values[-30:],
             mode='lines+markers',
             name='Light',
             line=dict(color='#ffbb00', width=2),
@@ -174,13 +184,12 @@ def create_light_chart(df_log):
 
     return fig
 
-def create_water_level_chart(df_log):
-    """Create water level and flow trend chart"""
+def _build_water_level_chart(df_log):
+    """Create water level and flow trend chart (build penuh dengan validasi Plotly)"""
     if df_log.empty or len(df_log) < 2:
         return None
 
-    df_recent = df_log.tail(30).copy()
-    df_recent['timestamp'] = pd.to_datetime(df_recent['timestamp'])
+    timestamps = df_log['timestamp'].values[-30:]
 
     fig = make_subplots(
         rows=2, cols=1,
@@ -190,9 +199,9 @@ def create_water_level_chart(df_log):
 
     # Water Level
     fig.add_trace(
-        go.Scatter(
-            x=df_recent['timestamp'],
-            y=df_recent['water_level'],
+        go.Scattergl(
+            x=timestamps,
+            y=df_log['water_level'].values[-30:],
             mode='lines+markers',
             name='Water Level',
             line=dict(color='#17becf', width=2),
@@ -205,9 +214,9 @@ def create_water_level_chart(df_log):
 
     # Water Flow
     fig.add_trace(
-        go.Scatter(
-            x=df_recent['timestamp'],
-            y=df_recent['water_flow'],
+        go.Scattergl(
+            x=timestamps,
+            y=df_log['water_flow'].values[-30:],
             mode='lines+markers',
             name='Water Flow',
             line=dict(color='#8c564b', width=2),
@@ -230,6 +239,65 @@ def create_water_level_chart(df_log):
 
     return fig
 
+# Layout + style trace tiap trend chart (tanpa data x/y), diambil dari build pertama
+_TREND_TEMPLATES = {}
+
+def _chart_from_template(build_fn, df_log):
+    """
+    Build pertama memakai build_fn (make_subplots + validasi penuh) dan disimpan
+    sebagai template dict; build berikutnya clone template tanpa validasi ulang
+    lalu cukup isi data x/y.
+    """
+    if df_log.empty or len(df_log) < 2:
+        return None
+
+    template = _TREND_TEMPLATES.get(build_fn)
+    if template is None:
+        fig = build_fn(df_log)
+        template = fig.to_dict()
+        for trace in template['data']:
+            trace.pop('x', None)
+            trace.pop('y', None)
+        _TREND_TEMPLATES[build_fn] = template
+        return fig
+
+    fig = go.Figure(copy.deepcopy(template), _validate=False)
+    return update_trend_chart(fig, df_log)
+
+def create_temperature_trend_chart(df_log):
+    """Create temperature trend chart (air & water temperature)"""
+    return _chart_from_template(_build_temperature_trend_chart, df_log)
+
+def create_ph_tds_chart(df_log):
+    """Create pH and TDS trend chart"""
+    return _chart_from_template(_build_ph_tds_chart, df_log)
+
+def create_humidity_chart(df_log):
+    """Create humidity trend chart"""
+    return _chart_from_template(_build_humidity_chart, df_log)
+
+def create_light_chart(df_log):
+    """Create light (LDR) trend chart"""
+    return _chart_from_template(_build_light_chart, df_log)
+
+def create_water_level_chart(df_log):
+    """Create water level and flow trend chart"""
+    return _chart_from_template(_build_water_level_chart, df_log)
+
+def update_trend_chart(fig, df_log):
+    """Update x/y data trace pada trend chart yang sudah ada (layout tidak dibangun ulang)"""
+    timestamps = df_log['timestamp'].values[-30:]
+
+    # batch_update: semua perubahan trace dikirim sebagai satu update figure
+    with fig.batch_update():
+        for trace in fig.data:
+            column = TREND_TRACE_COLUMNS.get(trace.name)
+            if column in df_log.columns:
+                trace.x = timestamps
+                trace.y = df_log[column].values[-30:]
+
+    return fig
+
 def create_status_pie_chart(df_log):
     """Create status distribution pie chart"""
     if df_log.empty:
@@ -238,7 +306,9 @@ def create_status_pie_chart(df_log):
     if 'status' not in df_log.columns:
         return None
         
-    counts = df_log['status'].value_counts()
+    # status bertipe category: hitung per kode, buang kategori yang tidak muncul
+    counts = df_log['status'].value_counts(sort=False)
+    counts = counts[counts > 0]
     
     fig = px.pie(
         values=counts.values,
@@ -251,14 +321,11 @@ def create_status_pie_chart(df_log):
     fig.update_layout(height=400)
     return fig
 
-def create_label_distribution_charts(df_log):
-    """Create distribution charts for all 4 labels"""
-    if df_log.empty:
-        return None
-
-    # Check if label columns exist
+def create_label_distribution_charts(label_counts):
+    """Create distribution charts for all 4 labels dari {kolom: {label: count}}"""
+    # Check if label counts exist
     label_cols = ['ph_label', 'tds_label', 'ambient_label', 'light_label']
-    if not all(col in df_log.columns for col in label_cols):
+    if not label_counts or not all(label_counts.get(col) for col in label_cols):
         return None
 
     fig = make_subplots(
@@ -269,30 +336,30 @@ def create_label_distribution_charts(df_log):
     )
 
     # pH Labels
-    ph_counts = df_log['ph_label'].value_counts()
+    ph_counts = label_counts['ph_label']
     fig.add_trace(
-        go.Pie(labels=ph_counts.index, values=ph_counts.values, name="pH"),
+        go.Pie(labels=list(ph_counts), values=list(ph_counts.values()), name="pH"),
         row=1, col=1
     )
 
     # TDS Labels
-    tds_counts = df_log['tds_label'].value_counts()
+    tds_counts = label_counts['tds_label']
     fig.add_trace(
-        go.Pie(labels=tds_counts.index, values=tds_counts.values, name="TDS"),
+        go.Pie(labels=list(tds_counts), values=list(tds_counts.values()), name="TDS"),
         row=1, col=2
     )
 
     # Ambient Labels
-    ambient_counts = df_log['ambient_label'].value_counts()
+    ambient_counts = label_counts['ambient_label']
     fig.add_trace(
-        go.Pie(labels=ambient_counts.index, values=ambient_counts.values, name="Ambient"),
+        go.Pie(labels=list(ambient_counts), values=list(ambient_counts.values()), name="Ambient"),
         row=2, col=1
     )
 
     # Light Labels
-    light_counts = df_log['light_label'].value_counts()
+    light_counts = label_counts['light_label']
     fig.add_trace(
-        go.Pie(labels=light_counts.index, values=light_counts.values, name="Light"),
+        go.Pie(labels=list(light_counts), values=list(light_counts.values()), name="Light"),
         row=2, col=2
     )
 
@@ -314,15 +381,22 @@ def create_correlation_heatmap(df_log):
     if len(available_cols) < 2:
         return None
 
-    corr_matrix = df_log[available_cols].corr()
+    # Korelasi via np.corrcoef (satu perkalian matriks) jika semua nilai valid;
+    # jika ada NaN pakai df.corr() yang membuang NaN per pasangan kolom
+    values = df_log[available_cols].to_numpy(dtype=np.float32)
+    if np.isfinite(values).all():
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr_matrix = np.corrcoef(values, rowvar=False)
+    else:
+        corr_matrix = df_log[available_cols].corr().to_numpy()
 
     fig = go.Figure(data=go.Heatmap(
-        z=corr_matrix.values,
-        x=corr_matrix.columns,
-        y=corr_matrix.columns,
+        z=corr_matrix,
+        x=available_cols,
+        y=available_cols,
         colorscale='RdBu',
         zmid=0,
-        text=corr_matrix.values,
+        text=corr_matrix,
         texttemplate='%{text:.2f}',
         textfont={"size": 10},
         colorbar=dict(title="Correlation")
@@ -1,6 +1,7 @@
+import numpy as np
 import pandas as pd
-import random
-from datetime import datetime, timedelta
+from datetime import datetime
+from labeling import add_labels_to_dataset, save_csv
 
 # ================================
 # CONFIGURATION
@@ -8,7 +9,10 @@ from datetime import datetime, timedelta
 TOTAL_ROWS = 1500
 START_TIME = datetime.now()
 
-data = []
+SEED = None  # Isi angka (mis. 42) untuk dataset yang reproducible
+
+# Satu Generator (PCG64) untuk semua sampling & noise labeling
+rng = np.random.default_rng(SEED)
 
 # ================================
 # STRATEGI: Generate data untuk setiap kombinasi label
@@ -59,116 +63,125 @@ LDR_RANGES = {
 WATER_TEMP_LOW = (20, 28)   # tidak trigger adjustment
 WATER_TEMP_HIGH = (28.1, 30) # trigger adjustment
 
-row_id = 1
-
-# Generate untuk setiap kombinasi label
-for ph_label in range(5):
-    for tds_label in range(5):
-        for ambient_label in range(3):
-            for light_label in range(3):
-                
-                # Generate 6-7 samples untuk setiap kombinasi
-                samples_per_combo = random.randint(6, 7)
-                
-                for _ in range(samples_per_combo):
-                    if row_id > TOTAL_ROWS:
-                        break
-                    
-                    timestamp = START_TIME + timedelta(seconds=row_id*30)
-                    
-                    # Generate pH
-                    ph_range = pH_RANGES[ph_label]
-                    ph = round(random.uniform(ph_range[0], ph_range[1]), 2)
-                    
-                    # Generate TDS (consider adjustment for water temp)
-                    tds_range = TDS_RANGES[tds_label]
-                    # Jika target tds_label butuh adjustment, generate nilai lebih tinggi
-                    use_high_water_temp = random.choice([True, False])
-                    if use_high_water_temp:
-                        water_temperature = round(random.uniform(28.1, 30), 2)
-                        # Add offset untuk compensate adjustment
-                        tds = int(random.uniform(tds_range[0] + 40, tds_range[1] + 70))
-                    else:
-                        water_temperature = round(random.uniform(20, 28), 2)
-                        tds = int(random.uniform(tds_range[0], tds_range[1]))
-                    
-                    # Generate Ambient (temperature + humidity)
-                    ambient_config = AMBIENT_CONFIGS[ambient_label]
-                    
-                    # Pilih salah satu range untuk temp dan humidity
-                    temp_ranges = ambient_config['temp']
-                    humidity_ranges = ambient_config['humidity']
-                    
-                    temp_range = random.choice(temp_ranges)
-                    humidity_range = random.choice(humidity_ranges)
-                    
-                    air_temperature = round(random.uniform(temp_range[0], temp_range[1]), 2)
-                    air_humidity = round(random.uniform(humidity_range[0], humidity_range[1]), 2)
-                    
-                    # Generate LDR
-                    ldr_range = LDR_RANGES[light_label]
-                    ldr_value = int(random.uniform(ldr_range[0], ldr_range[1]))
-                    
-                    # Generate water flow (random, tidak affect label)
-                    water_flow = round(random.uniform(8.0, 15.0), 2)
-                    
-                    # Generate water level (random, tidak affect label)
-                    water_level = round(random.uniform(10.0, 15.0), 2)
-                    
-                    data.append([
-                        row_id,
-                        timestamp,
-                        ph,
-                        tds,
-                        water_flow,
-                        air_humidity,
-                        air_temperature,
-                        ldr_value,
-                        water_temperature,
-                        water_level
-                    ])
-                    
-                    row_id += 1
-                
-                if row_id > TOTAL_ROWS:
-                    break
-            if row_id > TOTAL_ROWS:
-                break
-        if row_id > TOTAL_ROWS:
-            break
-    if row_id > TOTAL_ROWS:
-        break
-
-# Shuffle data agar tidak terurut berdasarkan label
-random.shuffle(data)
-
-# Re-assign ID dan timestamp setelah shuffle
-for i, row in enumerate(data, 1):
-    row[0] = i  # Update ID
-    row[1] = START_TIME + timedelta(seconds=i*30)  # Update timestamp
+def range_bounds(ranges):
+    """Array (n_label, 2) berisi (low, high) per label, diindex dengan label"""
+    return np.array([ranges[key] for key in sorted(ranges)], dtype=float)
+
+def ambient_bounds(key):
+    """
+    Jumlah pilihan range per label + array lows & highs (n_label, n_pilihan) range ambient;
+    label dengan pilihan lebih sedikit diisi berulang supaya bisa diindex langsung
+    """
+    n_choices = np.array([len(AMBIENT_CONFIGS[label][key]) for label in sorted(AMBIENT_CONFIGS)])
+    bounds = np.array([
+        [AMBIENT_CONFIGS[label][key][i % n_choices[label]] for i in range(n_choices.max())]
+        for label in sorted(AMBIENT_CONFIGS)
+    ], dtype=float)
+    return n_choices, np.ascontiguousarray(bounds[..., 0]), np.ascontiguousarray(bounds[..., 1])
+
+# Bounds dihitung sekali, sampling cukup fancy indexing per label
+PH_BOUNDS = range_bounds(pH_RANGES)
+TDS_BOUNDS = range_bounds(TDS_RANGES)
+LDR_BOUNDS = range_bounds(LDR_RANGES)
+AMBIENT_TEMP_CHOICES, AMBIENT_TEMP_LOWS, AMBIENT_TEMP_HIGHS = ambient_bounds('temp')
+AMBIENT_HUMIDITY_CHOICES, AMBIENT_HUMIDITY_LOWS, AMBIENT_HUMIDITY_HIGHS = ambient_bounds('humidity')
+
+# Label per kombinasi (urutan pH -> TDS -> Ambient -> Light), 225 kombinasi
+combo_labels = np.array([
+    (ph_label, tds_label, ambient_label, light_label)
+    for ph_label in range(5)
+    for tds_label in range(5)
+    for ambient_label in range(3)
+    for light_label in range(3)
+])
+
+# Generate 6-7 samples untuk setiap kombinasi (maksimal TOTAL_ROWS baris).
+# Baris label langsung di-shuffle sekali (satu permutation), sehingga semua kolom
+# hasil sampling sudah acak dan tidak perlu di-index ulang per kolom
+samples_per_combo = rng.integers(6, 8, len(combo_labels))
+# Potong jumlah sample kombinasi terakhir supaya total tepat <= TOTAL_ROWS (tanpa slicing hasil repeat)
+samples_per_combo = np.diff(np.minimum(np.concatenate(([0], samples_per_combo.cumsum())), TOTAL_ROWS))
+labels = rng.permutation(np.repeat(combo_labels, samples_per_combo, axis=0))
+ph_label, tds_label, ambient_label, light_label = labels.T
+n_rows = len(labels)
+
+def uniform_by_label(bounds, label):
+    """Sample uniform per baris dari range (low, high) milik label baris tersebut"""
+    return rng.uniform(bounds[label, 0], bounds[label, 1])
+
+# Generate pH
+ph = uniform_by_label(PH_BOUNDS, ph_label).round(2)
+
+# Generate TDS (consider adjustment for water temp)
+# Jika target tds_label butuh adjustment, generate nilai lebih tinggi
+use_high_water_temp = rng.random(n_rows) < 0.5
+water_temperature = np.where(
+    use_high_water_temp,
+    rng.uniform(WATER_TEMP_HIGH[0], WATER_TEMP_HIGH[1], n_rows),
+    rng.uniform(WATER_TEMP_LOW[0], WATER_TEMP_LOW[1], n_rows)
+).round(2)
+tds_bounds = TDS_BOUNDS[tds_label]
+# Add offset untuk compensate adjustment
+tds_offset = np.where(use_high_water_temp[:, np.newaxis], [40, 70], [0, 0])
+tds_bounds = tds_bounds + tds_offset
+tds = rng.uniform(tds_bounds[:, 0], tds_bounds[:, 1]).astype(int)
+
+# Generate Ambient (temperature + humidity)
+# Pilih salah satu range untuk temp dan humidity (range[label][pilihan] = (low, high))
+def pick_ambient_range(n_choices, lows, highs):
+    """Sample uniform dari salah satu range ambient (index pilihan acak) milik label baris"""
+    choice = rng.integers(0, n_choices[ambient_label])
+    flat_index = ambient_label * lows.shape[1] + choice
+    return rng.uniform(lows.take(flat_index), highs.take(flat_index))
+
+air_temperature = pick_ambient_range(AMBIENT_TEMP_CHOICES, AMBIENT_TEMP_LOWS, AMBIENT_TEMP_HIGHS).round(2)
+air_humidity = pick_ambient_range(AMBIENT_HUMIDITY_CHOICES, AMBIENT_HUMIDITY_LOWS, AMBIENT_HUMIDITY_HIGHS).round(2)
+
+# Generate LDR
+ldr_value = uniform_by_label(LDR_BOUNDS, light_label).astype(int)
+
+# Generate water flow & water level (random, tidak affect label)
+water_flow = rng.uniform(8.0, 15.0, n_rows).round(2)
+water_level = rng.uniform(10.0, 15.0, n_rows).round(2)
 
 # ================================
 # CREATE DATAFRAME
 # ================================
-columns = [
-    "id",
-    "timestamp",
-    "ph",
-    "tds",
-    "water_flow",
-    "air_humidity",
-    "air_temperature",
-    "ldr_value",
-    "water_temperature",
-    "water_level"
-]
-
-df = pd.DataFrame(data, columns=columns)
+# Data sudah acak (labels di-shuffle di atas), assign ID & timestamp berurutan
+ids = np.arange(1, n_rows + 1, dtype=np.int32)
+timestamps = np.datetime64(START_TIME, 's') + ids * np.timedelta64(30, 's')
+
+# copy=False: kolom DataFrame langsung memakai array hasil sampling (tanpa copy)
+df = pd.DataFrame({
+    "id": ids,
+    "timestamp": timestamps,
+    "ph": ph,
+    "tds": tds,
+    "water_flow": water_flow,
+    "air_humidity": air_humidity,
+    "air_temperature": air_temperature,
+    "ldr_value": ldr_value,
+    "water_temperature": water_temperature,
+    "water_level": water_level
+}, copy=False)
+
+# Tipe kolom ringkas untuk CSV (float32 untuk sensor desimal, int32 untuk TDS/LDR).
+# Labeling tetap memakai nilai float64 supaya batas bin (mis. pH 6.8) tidak bergeser.
+COLUMN_DTYPES = {
+    "tds": np.int32,
+    "ldr_value": np.int32,
+    "ph": np.float32,
+    "water_flow": np.float32,
+    "air_humidity": np.float32,
+    "air_temperature": np.float32,
+    "water_temperature": np.float32,
+    "water_level": np.float32
+}
 
 # ================================
 # SAVE TO CSV
 # ================================
-df.to_csv("hydroponic_dummy_data.csv", index=False)
+save_csv(df.astype(COLUMN_DTYPES), "hydroponic_dummy_data.csv")
 
 print("✅ Dummy dataset successfully generated: hydroponic_dummy_data.csv")
 print(f"📊 Total rows: {len(df)}")
@@ -180,4 +193,10 @@ print(f"TDS: {df['tds'].min()} - {df['tds'].max()}")
 print(f"Air Temp: {df['air_temperature'].min():.2f} - {df['air_temperature'].max():.2f}")
 print(f"Air Humidity: {df['air_humidity'].min():.2f} - {df['air_humidity'].max():.2f}")
 print(f"LDR: {df['ldr_value'].min()} - {df['ldr_value'].max()}")
-print(f"Water Temp: {df['water_temperature'].min():.2f} - {df['water_temperature'].max():.2f}")
\ No newline at end of file
+print(f"Water Temp: {df['water_temperature'].min():.2f} - {df['water_temperature'].max():.2f}")
+
+# ================================
+# LABELING (langsung dari DataFrame, tanpa baca ulang CSV)
+# ================================
+print()
+add_labels_to_dataset(df=df, rng=rng)
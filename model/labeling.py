@@ -1,6 +1,55 @@
 import pandas as pd
 import numpy as np
 
+try:
+    from numba import njit, prange
+except ImportError:  # numba opsional, fallback ke Python biasa
+    njit = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+except ImportError:  # pyarrow opsional, fallback ke writer CSV pandas
+    pa = None
+else:
+    # Header & nilai tanpa tanda kutip, sama seperti output to_csv
+    _CSV_WRITE_OPTIONS = pacsv.WriteOptions(quoting_style="none", quoting_header="none")
+
+rng = np.random.default_rng()
+
+# Jumlah baris per chunk saat menulis CSV (membatasi peak memory untuk dataset besar)
+CSV_CHUNK_ROWS = 65536
+
+# Batas bin label (np.digitize, right=False: bins[i-1] <= x < bins[i]).
+# Batas atas inklusif (Normal <= 6.8, High <= 7.2, dst.) pakai nextafter,
+# celah lama (mis. 6.8 < pH < 6.9) sekarang masuk ke label di atasnya, bukan "Too High".
+PH_BINS = np.array([5.5, 6.0, np.nextafter(6.8, np.inf), np.nextafter(7.2, np.inf)])
+TDS_BINS = np.array([560, 1050, np.nextafter(1680, np.inf), np.nextafter(2100, np.inf)])
+LDR_BINS = np.array([500, np.nextafter(2500, np.inf)])
+
+# Label hanya 3-5 kelas -> int8. Saat baca CSV kolom integer langsung int32;
+# kolom sensor desimal tetap float64 karena float32 menggeser batas bin (6.8f -> 6.8000002)
+LABEL_DTYPE = np.int8
+CSV_DTYPES = {'id': np.int32, 'timestamp': str, 'tds': np.int32, 'ldr_value': np.int32}
+
+# (kolom label, judul di statistik, jumlah kelas)
+LABEL_STATS = (
+    ('ph_label', '🔵 pH Label', len(PH_BINS) + 1),
+    ('tds_label', '🟢 TDS Label', len(TDS_BINS) + 1),
+    ('ambient_label', '🟡 Ambient Label', 3),
+    ('light_label', '🟠 Light Label', len(LDR_BINS) + 1)
+)
+
+def _jit(signature):
+    """
+    Compile fungsi label scalar (untuk pemakaian per-reading / streaming) dengan
+    signature tetap saat import jika numba tersedia; tanpa numba fungsi dipakai apa adanya.
+    """
+    if njit is None:
+        return lambda fn: fn
+    return njit(signature, cache=True)
+
+@_jit("int64(float64, float64)")
 def label_ph(ph_value, water_temp):
     """
     Label pH dengan 5 classes
@@ -12,19 +61,11 @@ def label_ph(ph_value, water_temp):
     else:
         ph_adjusted = ph_value
     
-    # Labeling
-    if ph_adjusted < 5.5:
-        return 0  # Too Low
-    elif 5.5 <= ph_adjusted < 6.0:
-        return 1  # Low
-    elif 6.0 <= ph_adjusted <= 6.8:
-        return 2  # Normal ✅
-    elif 6.9 <= ph_adjusted <= 7.2:
-        return 3  # High
-    else:  # > 7.2
-        return 4  # Too High
+    # Labeling: 0 Too Low, 1 Low, 2 Normal ✅, 3 High, 4 Too High
+    return int(np.searchsorted(PH_BINS, ph_adjusted, side='right'))
 
 
+@_jit("int64(float64, float64)")
 def label_tds(tds_value, water_temp):
     """
     Label TDS/PPM dengan 5 classes
@@ -36,19 +77,11 @@ def label_tds(tds_value, water_temp):
     else:
         tds_adjusted = tds_value
     
-    # Labeling
-    if tds_adjusted < 560:
-        return 0  # Too Low
-    elif 560 <= tds_adjusted < 1050:
-        return 1  # Low
-    elif 1050 <= tds_adjusted <= 1680:
-        return 2  # Normal ✅
-    elif 1681 <= tds_adjusted <= 2100:
-        return 3  # High
-    else:  # > 2100
-        return 4  # Too High
+    # Labeling: 0 Too Low, 1 Low, 2 Normal ✅, 3 High, 4 Too High
+    return int(np.searchsorted(TDS_BINS, tds_adjusted, side='right'))
 
 
+@_jit("int64(float64, float64)")
 def label_ambient(air_temp, air_humidity):
     """
     Label ambient (kombinasi temperature + humidity) dengan 3 classes
@@ -71,47 +104,111 @@ def label_ambient(air_temp, air_humidity):
     return 1  # Slightly Off
 
 
+@_jit("int64(float64)")
 def label_light(ldr_value):
     """
     Label LDR dengan 3 classes
     """
-    if ldr_value < 500:
-        return 0  # Too Dark
-    elif 500 <= ldr_value <= 2500:
-        return 1  # Normal ✅
-    else:  # > 2500
-        return 2  # Too Bright
+    # 0 Too Dark, 1 Normal ✅, 2 Too Bright
+    return int(np.searchsorted(LDR_BINS, ldr_value, side='right'))
+
+
+def save_csv(df, path):
+    """
+    Simpan DataFrame ke CSV tanpa index, per chunk CSV_CHUNK_ROWS baris
+    (writer C++ pyarrow jika tersedia)
+    """
+    if pa is not None:
+        try:
+            schema = pa.Schema.from_pandas(df, preserve_index=False)
+            with pacsv.CSVWriter(path, schema, write_options=_CSV_WRITE_OPTIONS) as writer:
+                for start in range(0, len(df), CSV_CHUNK_ROWS):
+                    chunk = df.iloc[start:start + CSV_CHUNK_ROWS]
+                    writer.write_batch(pa.RecordBatch.from_pandas(chunk, schema=schema, preserve_index=False))
+            return
+        except pa.ArrowInvalid:  # Ada nilai yang perlu di-quote, biarkan pandas yang menulis
+            pass
+    df.to_csv(path, index=False, chunksize=CSV_CHUNK_ROWS)
+
+
+if njit is not None:
+    @njit(parallel=True, cache=True)
+    def _label_all(ph_adjusted, tds_adjusted, air_temp, air_humidity, ldr,
+                   ph_out, tds_out, ambient_out, light_out):
+        """Hitung 4 label semua baris dalam satu loop paralel (prange), hasil ditulis ke *_out"""
+        for i in prange(ph_adjusted.shape[0]):
+            ph_out[i] = np.searchsorted(PH_BINS, ph_adjusted[i], side='right')
+            tds_out[i] = np.searchsorted(TDS_BINS, tds_adjusted[i], side='right')
+            ambient_out[i] = label_ambient(air_temp[i], air_humidity[i])
+            light_out[i] = label_light(ldr[i])
+else:
+    def _label_all(ph_adjusted, tds_adjusted, air_temp, air_humidity, ldr,
+                   ph_out, tds_out, ambient_out, light_out):
+        """Hitung 4 label semua baris (vectorized numpy), hasil ditulis ke *_out"""
+        ph_out[:] = np.digitize(ph_adjusted, PH_BINS)
+        tds_out[:] = np.digitize(tds_adjusted, TDS_BINS)
+
+        temp_ideal = (air_temp >= 18) & (air_temp <= 28)
+        humidity_ideal = (air_humidity >= 40) & (air_humidity <= 70)
+        temp_bad = (air_temp < 16) | (air_temp > 32)
+        humidity_bad = (air_humidity < 35) | (air_humidity > 80)
+        ambient_out[:] = np.select(
+            [temp_ideal & humidity_ideal, temp_bad | humidity_bad],
+            [2, 0], default=1
+        )
+
+        light_out[:] = np.digitize(ldr, LDR_BINS)
 
 
 def add_labels_to_dataset(input_csv='hydroponic_dummy_data.csv', 
-                         output_csv='hydroponic_labeled_data.csv'):
+                         output_csv='hydroponic_labeled_data.csv',
+                         df=None, write_csv=True, rng=rng):
     """
-    Membaca CSV, menambahkan label, dan menyimpan hasil
+    Membaca CSV (atau pakai DataFrame df di memory, label ditambahkan langsung ke df),
+    menambahkan label, dan menyimpan hasil jika write_csv.
+    rng: np.random.Generator untuk noise adjustment (mis. milik generator dataset)
     """
     # Baca data
-    df = pd.read_csv(input_csv)
+    if df is None:
+        # Parser multi-thread pyarrow jika tersedia, fallback ke C engine pandas
+        df = pd.read_csv(input_csv, dtype=CSV_DTYPES, engine='pyarrow' if pa is not None else 'c')
     
-    # Tambahkan kolom label
-    df['ph_label'] = df.apply(lambda row: label_ph(row['ph'], row['water_temperature']), axis=1)
-    df['tds_label'] = df.apply(lambda row: label_tds(row['tds'], row['water_temperature']), axis=1)
-    df['ambient_label'] = df.apply(lambda row: label_ambient(row['air_temperature'], row['air_humidity']), axis=1)
-    df['light_label'] = df.apply(lambda row: label_light(row['ldr_value']), axis=1)
+    # Tambahkan kolom label (langsung pada ndarray, aturan sama dengan label_* di atas).
+    # to_numpy(dtype=float64) tidak meng-copy kolom yang sudah float64
+    arrs = {col: df[col].to_numpy(dtype=np.float64)
+            for col in ('ph', 'tds', 'water_temperature', 'air_temperature', 'air_humidity', 'ldr_value')}
+
+    # Adjust pH & TDS jika water temperature tinggi
+    # (noise di-draw sekali per kolom, hanya untuk baris yang perlu adjustment)
+    hot = arrs['water_temperature'] > 28
+    n_hot = np.count_nonzero(hot)
+    ph_adjusted = arrs['ph'].copy()
+    tds_adjusted = arrs['tds'].copy()
+    ph_adjusted[hot] -= rng.uniform(0.1, 0.2, n_hot)
+    tds_adjusted[hot] -= rng.uniform(40, 70, n_hot)
+
+    labels = {col: np.empty(len(df), dtype=LABEL_DTYPE)
+              for col in ('ph_label', 'tds_label', 'ambient_label', 'light_label')}
+    _label_all(ph_adjusted, tds_adjusted,
+               arrs['air_temperature'], arrs['air_humidity'], arrs['ldr_value'],
+               *labels.values())
+    for col, values in labels.items():
+        df[col] = values
     
     # Simpan hasil
-    df.to_csv(output_csv, index=False)
+    if write_csv:
+        save_csv(df, output_csv)
     
     # Tampilkan statistik
     print("✅ Labeling completed successfully!")
-    print(f"📁 Output file: {output_csv}")
+    if write_csv:
+        print(f"📁 Output file: {output_csv}")
     print("\n📊 Label Distribution:")
-    print("\n🔵 pH Label:")
-    print(df['ph_label'].value_counts().sort_index())
-    print("\n🟢 TDS Label:")
-    print(df['tds_label'].value_counts().sort_index())
-    print("\n🟡 Ambient Label:")
-    print(df['ambient_label'].value_counts().sort_index())
-    print("\n🟠 Light Label:")
-    print(df['light_label'].value_counts().sort_index())
+    for col, title, n_classes in LABEL_STATS:
+        print(f"\n{title}:")
+        # bincount: satu pass O(N) tanpa hashing/sort, kelas kosong tetap tampil (0)
+        for label, count in enumerate(np.bincount(labels[col], minlength=n_classes)):
+            print(f"{label}    {count}")
     
     # Tampilkan sample data
     print("\n📋 Sample of labeled data:")